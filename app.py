@@ -1,13 +1,28 @@
-from flask import Flask, render_template, request, jsonify, session
+# Monkey-patch the standard library for gevent workers before any other
+# imports, so anthropic's HTTP stack and threading primitives cooperate
+# with greenlets. Safe no-op when gevent is not installed (dev server).
+try:
+    from gevent import monkey
+    monkey.patch_all()
+    _GEVENT_PATCHED = True
+except ImportError:
+    _GEVENT_PATCHED = False
+
+from flask import Flask, render_template, request, jsonify, session, Response, stream_with_context
 from flask_cors import CORS
+from flask_compress import Compress
+import hashlib
+import json
 import logging
+import orjson
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import os
 from claude_ai import ClaudeAI
 from config import Config
-import markdown
-import bleach
+from formatting import escape_message, format_message
+from timeutils import now_iso
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -17,10 +32,21 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 app.config.from_object(Config)
 CORS(app)
+Compress(app)
 
 # Global AI instance
 claude_ai = None
 
+# Thread pool for markdown rendering. Under gevent, patch_all() would turn
+# ThreadPoolExecutor workers into greenlets on the request thread, so use
+# the hub's native thread pool there — real OS threads that keep CPU-bound
+# formatting from starving I/O-bound greenlets.
+if _GEVENT_PATCHED:
+    from gevent.hub import get_hub
+    MD_POOL = get_hub().threadpool
+else:
+    MD_POOL = ThreadPoolExecutor(max_workers=os.cpu_count())
+
 def get_ai_instance():
     """Get or create Claude AI instance."""
     global claude_ai
@@ -33,26 +59,15 @@ def get_ai_instance():
             raise
     return claude_ai
 
-def format_message(content: str) -> str:
-    """Format message content with markdown and sanitization."""
-    try:
-        # Convert markdown to HTML
-        html = markdown.markdown(content, extensions=['codehilite', 'fenced_code'])
-        # Sanitize HTML to prevent XSS
-        safe_html = bleach.clean(html, tags=[
-            'p', 'br', 'strong', 'em', 'u', 'ol', 'ul', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
-            'blockquote', 'code', 'pre', 'a', 'div', 'span'
-        ], attributes={
-            'a': ['href', 'title'],
-            'div': ['class'],
-            'span': ['class'],
-            'code': ['class'],
-            'pre': ['class']
-        })
-        return safe_html
-    except Exception as e:
-        logger.error(f"Error formatting message: {e}")
-        return content
+def _render_message(msg):
+    """Render a stored message for display; user content is escape-only."""
+    if msg['role'] == 'user':
+        return escape_message(msg['content'])
+    return format_message(msg['content'])
+
+def json_response(payload, status=200):
+    """Serialize a JSON response with orjson (faster than jsonify)."""
+    return Response(orjson.dumps(payload), status=status, mimetype='application/json')
 
 @app.route('/')
 def index():
@@ -77,18 +92,56 @@ def chat():
         # Generate response
         response = ai.generate_response_sync(user_message)
         
-        return jsonify({
+        payload = {
             'response': response,
-            'formatted_response': format_message(response),
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now_iso(),
             'conversation_summary': ai.get_conversation_summary()
-        })
+        }
+
+        # HTML rendering is opt-in (?format=html) so clients that only use
+        # the raw response are not sent a second copy of the message.
+        # add_to_conversation just stored this response with its rendering
+        # cached, so serve that instead of rendering again
+        if request.args.get('format') == 'html':
+            last = ai.get_conversation_history()[-1]
+            if last['role'] == 'assistant' and last.get('formatted_content') is not None:
+                payload['formatted_response'] = last['formatted_content']
+            else:
+                payload['formatted_response'] = format_message(response)
+
+        return json_response(payload)
         
     except Exception as e:
         logger.error(f"Error in chat endpoint: {e}")
         logger.error(traceback.format_exc())
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Handle chat messages with a streamed (SSE) response."""
+    data = request.get_json()
+    if not data or 'message' not in data:
+        return jsonify({'error': 'No message provided'}), 400
+
+    user_message = data['message'].strip()
+    if not user_message:
+        return jsonify({'error': 'Empty message'}), 400
+
+    # Get AI instance
+    ai = get_ai_instance()
+
+    def generate():
+        try:
+            for chunk in ai.generate_response_stream(user_message):
+                yield f"data: {json.dumps({'text': chunk})}\n\n"
+            yield "data: [DONE]\n\n"
+        except Exception as e:
+            logger.error(f"Error in chat stream endpoint: {e}")
+            logger.error(traceback.format_exc())
+            yield f"data: {json.dumps({'error': str(e)})}\n\n"
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream')
+
 @app.route('/api/conversation/clear', methods=['POST'])
 def clear_conversation():
     """Clear conversation history."""
@@ -106,22 +159,37 @@ def get_conversation_history():
     try:
         ai = get_ai_instance()
         history = ai.get_conversation_history()
-        
-        # Format messages for display
-        formatted_history = []
-        for msg in history:
-            formatted_msg = {
-                'role': msg['role'],
-                'content': msg['content'],
-                'formatted_content': format_message(msg['content']),
-                'timestamp': msg.get('timestamp', '')
-            }
-            formatted_history.append(formatted_msg)
-        
-        return jsonify({
-            'history': formatted_history,
+
+        # Cache validation: the version counter changes on every history
+        # mutation, so a matching ETag means the client copy is current
+        # and serialization can be skipped entirely. The ETag is weak so
+        # flask-compress does not rewrite it per content-encoding, and
+        # matching must accept the weak form clients echo back
+        etag = hashlib.blake2b(
+            f"{ai.conversation_version}:{len(history)}".encode(),
+            digest_size=8
+        ).hexdigest()
+        if request.if_none_match.contains_weak(etag):
+            not_modified = Response(status=304)
+            not_modified.set_etag(etag, weak=True)
+            return not_modified
+
+        # Messages are stored display-ready (role, content,
+        # formatted_content, timestamp), so they can be serialized as-is;
+        # any cache misses (e.g. imported conversations) are rendered as
+        # one batch across the thread pool first
+        missing = [msg for msg in history if msg.get('formatted_content') is None]
+        if missing:
+            rendered = MD_POOL.map(_render_message, missing)
+            for msg, formatted_content in zip(missing, rendered):
+                msg['formatted_content'] = formatted_content
+
+        resp = json_response({
+            'history': list(history),
             'summary': ai.get_conversation_summary()
         })
+        resp.set_etag(etag, weak=True)
+        return resp
     except Exception as e:
         logger.error(f"Error getting conversation history: {e}")
         return jsonify({'error': str(e)}), 500
@@ -174,13 +242,13 @@ def health_check():
         return jsonify({
             'status': 'healthy',
             'model': Config.CLAUDE_MODEL,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': now_iso()
         })
     except Exception as e:
         return jsonify({
             'status': 'unhealthy',
             'error': str(e),
-            'timestamp': datetime.now().isoformat()
+            'timestamp': now_iso()
         }), 500
 
 @app.errorhandler(404)
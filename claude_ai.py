@@ -1,14 +1,23 @@
 import anthropic
-import json
+import httpx
 import logging
-from datetime import datetime
-from typing import List, Dict, Optional
+import orjson
+from collections import deque
+from typing import Deque, List, Dict, Optional
 from config import Config
+from timeutils import now_iso
+from formatting import escape_message, format_message
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Roles that are sent over the wire to the Claude API
+_WIRE_ROLES = frozenset({"user", "assistant"})
+
+# Connection pool limits shared by the sync and async API clients
+_HTTPX_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=100)
+
 class ClaudeAI:
     """
     Core AI class for interacting with Claude 4 Sonnet LLM.
@@ -18,10 +27,44 @@ class ClaudeAI:
     def __init__(self):
         """Initialize the Claude AI client and conversation memory."""
         Config.validate_config()
-        self.client = anthropic.Anthropic(api_key=Config.CLAUDE_API_KEY)
-        self.conversation_history: List[Dict] = []
+        # Explicit pooled httpx client so every API call reuses keep-alive
+        # connections (and HTTP/2 multiplexing) instead of paying a fresh
+        # TCP+TLS handshake; the async client is created lazily (see aclient)
+        self.client = anthropic.Anthropic(
+            api_key=Config.CLAUDE_API_KEY,
+            http_client=httpx.Client(http2=True, limits=_HTTPX_LIMITS)
+        )
+        self._aclient = None
+        # Bounded deques make appends O(1); old messages fall off the left
+        # end automatically instead of being trimmed with a list copy
+        self.conversation_history: Deque[Dict] = deque(maxlen=Config.CONVERSATION_HISTORY_LIMIT)
+        # Wire-format mirror of conversation_history ({"role", "content"}
+        # only), maintained incrementally so API calls need no per-turn rebuild
+        self._api_messages: Deque[Dict] = deque(maxlen=Config.CONVERSATION_HISTORY_LIMIT)
+        # Running counters so the conversation summary is O(1)
+        self._user_count = 0
+        self._assistant_count = 0
+        self._total_chars = 0
+        # Bumped on every history mutation; used for HTTP cache validation
+        self.conversation_version = 0
         self.system_prompt = self._get_default_system_prompt()
         
+    @property
+    def aclient(self) -> anthropic.AsyncAnthropic:
+        """
+        Async Anthropic client, created on first use.
+
+        Lazy construction lets the connection pool bind to the caller's
+        event loop; await generate_response from a single long-lived
+        loop, or the pooled connections end up stranded on a dead loop.
+        """
+        if self._aclient is None:
+            self._aclient = anthropic.AsyncAnthropic(
+                api_key=Config.CLAUDE_API_KEY,
+                http_client=httpx.AsyncClient(http2=True, limits=_HTTPX_LIMITS)
+            )
+        return self._aclient
+
     def _get_default_system_prompt(self) -> str:
         """Get the default system prompt for Claude."""
         return """You are Claude, a helpful, harmless, and honest AI assistant created by Anthropic. 
@@ -55,64 +98,75 @@ class ClaudeAI:
         message = {
             "role": role,
             "content": content,
-            "timestamp": datetime.now().isoformat()
+            # User messages rarely contain markdown; a plain escape is enough
+            "formatted_content": escape_message(content) if role == "user" else format_message(content),
+            "timestamp": now_iso()
         }
+        # The bounded deque will evict its oldest entry when full, so
+        # remove that message from the running counters first
+        if len(self.conversation_history) == Config.CONVERSATION_HISTORY_LIMIT:
+            evicted = self.conversation_history[0]
+            if evicted["role"] == "user":
+                self._user_count -= 1
+            elif evicted["role"] == "assistant":
+                self._assistant_count -= 1
+            self._total_chars -= len(evicted["content"])
+
         self.conversation_history.append(message)
-        
-        # Trim conversation history if it exceeds limit
-        if len(self.conversation_history) > Config.CONVERSATION_HISTORY_LIMIT:
-            # Keep the most recent messages
-            self.conversation_history = self.conversation_history[-Config.CONVERSATION_HISTORY_LIMIT:]
+        self._api_messages.append({"role": role, "content": content})
+
+        if role == "user":
+            self._user_count += 1
+        elif role == "assistant":
+            self._assistant_count += 1
+        self._total_chars += len(content)
+        self.conversation_version += 1
     
-    def get_conversation_history(self) -> List[Dict]:
-        """Get the current conversation history."""
-        return self.conversation_history.copy()
+    def get_conversation_history(self) -> Deque[Dict]:
+        """Get the current conversation history (treat as read-only)."""
+        return self.conversation_history
     
     def clear_conversation(self) -> None:
         """Clear the conversation history."""
-        self.conversation_history = []
+        self.conversation_history.clear()
+        self._api_messages.clear()
+        self._user_count = 0
+        self._assistant_count = 0
+        self._total_chars = 0
+        self.conversation_version += 1
         logger.info("Conversation history cleared")
     
-    def _prepare_messages(self, user_message: str) -> List[Dict]:
+    def _prepare_messages(self) -> List[Dict]:
         """Prepare messages for the Claude API call."""
-        messages = []
-        
-        # Add conversation history (excluding system messages)
-        for msg in self.conversation_history:
-            if msg["role"] in ["user", "assistant"]:
-                messages.append({
-                    "role": msg["role"],
-                    "content": msg["content"]
-                })
-        
-        # Add the current user message
-        messages.append({
-            "role": "user",
-            "content": user_message
-        })
-        
-        return messages
+        # The wire-format buffer is maintained as messages are added, so
+        # once the current user message is recorded it holds the full
+        # API payload already
+        return list(self._api_messages)
     
     async def generate_response(self, user_message: str, stream: bool = False) -> str:
         """
         Generate a response from Claude 4 Sonnet.
-        
+
+        Uses the async Anthropic client, so multiple coroutines can be
+        awaited concurrently (e.g. via asyncio.gather) for batched calls.
+
         Args:
             user_message: The user's input message
             stream: Whether to stream the response (for future implementation)
-            
+
         Returns:
             Claude's response as a string
         """
         try:
-            # Add user message to conversation history
+            # Add user message to conversation history; the wire buffer
+            # then contains the complete API payload
             self.add_to_conversation("user", user_message)
-            
+
             # Prepare messages for API call
-            messages = self._prepare_messages(user_message)
-            
+            messages = self._prepare_messages()
+
             # Make API call to Claude
-            response = self.client.messages.create(
+            response = await self.aclient.messages.create(
                 model=Config.CLAUDE_MODEL,
                 max_tokens=Config.MAX_TOKENS,
                 temperature=Config.TEMPERATURE,
@@ -149,32 +203,27 @@ class ClaudeAI:
     def generate_response_sync(self, user_message: str) -> str:
         """
         Synchronous version of generate_response for compatibility.
-        
+
+        Uses the pooled sync client directly rather than driving the
+        async client through asyncio.run: a fresh event loop per call
+        strands the async pool's keep-alive connections on a closed
+        loop, and asyncio.run cannot be nested inside a running loop
+        under gevent's patched threading.
+
         Args:
             user_message: The user's input message
-            
+
         Returns:
             Claude's response as a string
         """
         try:
-            # Add user message to conversation history
+            # Add user message to conversation history; the wire buffer
+            # then contains the complete API payload
             self.add_to_conversation("user", user_message)
-            
-            # Prepare messages for API call (remove the last message since we'll add it in the API call)
-            messages = []
-            for msg in self.conversation_history[:-1]:  # Exclude the just-added user message
-                if msg["role"] in ["user", "assistant"]:
-                    messages.append({
-                        "role": msg["role"],
-                        "content": msg["content"]
-                    })
-            
-            # Add the current user message
-            messages.append({
-                "role": "user",
-                "content": user_message
-            })
-            
+
+            # Prepare messages for API call
+            messages = self._prepare_messages()
+
             # Make API call to Claude
             response = self.client.messages.create(
                 model=Config.CLAUDE_MODEL,
@@ -183,16 +232,16 @@ class ClaudeAI:
                 system=self.system_prompt,
                 messages=messages
             )
-            
+
             # Extract the response content
             assistant_response = response.content[0].text
-            
+
             # Add assistant response to conversation history
             self.add_to_conversation("assistant", assistant_response)
-            
+
             logger.info(f"Generated response with {len(assistant_response)} characters")
             return assistant_response
-            
+
         except anthropic.AuthenticationError:
             error_msg = "Authentication failed. Please check your Claude API key."
             logger.error(error_msg)
@@ -209,27 +258,104 @@ class ClaudeAI:
             error_msg = f"Unexpected error: {str(e)}"
             logger.error(error_msg)
             raise Exception(error_msg)
+
+    def generate_response_stream(self, user_message: str):
+        """
+        Stream a response from Claude 4 Sonnet as text chunks.
+
+        Yields partial text as it arrives instead of buffering the full
+        response; the complete response is added to the conversation
+        history once the stream closes.
+
+        Args:
+            user_message: The user's input message
+
+        Yields:
+            Text chunks of Claude's response
+        """
+        try:
+            # Add user message to conversation history; the wire buffer
+            # then contains the complete API payload
+            self.add_to_conversation("user", user_message)
+
+            # Prepare messages for API call
+            messages = self._prepare_messages()
+
+            # Stream the response, accumulating chunks for the history
+            chunks = []
+            with self.client.messages.stream(
+                model=Config.CLAUDE_MODEL,
+                max_tokens=Config.MAX_TOKENS,
+                temperature=Config.TEMPERATURE,
+                system=self.system_prompt,
+                messages=messages
+            ) as stream:
+                for text in stream.text_stream:
+                    chunks.append(text)
+                    yield text
+
+            # Add the complete assistant response to conversation history
+            assistant_response = ''.join(chunks)
+            self.add_to_conversation("assistant", assistant_response)
+
+            logger.info(f"Streamed response with {len(assistant_response)} characters")
+
+        except anthropic.AuthenticationError:
+            error_msg = "Authentication failed. Please check your Claude API key."
+            logger.error(error_msg)
+            raise Exception(error_msg)
+        except anthropic.RateLimitError:
+            error_msg = "Rate limit exceeded. Please wait a moment before trying again."
+            logger.error(error_msg)
+            raise Exception(error_msg)
+        except anthropic.APIError as e:
+            error_msg = f"Claude API error: {str(e)}"
+            logger.error(error_msg)
+            raise Exception(error_msg)
     
     def get_conversation_summary(self) -> str:
         """Get a summary of the current conversation."""
         if not self.conversation_history:
             return "No conversation history yet."
-        
+
         message_count = len(self.conversation_history)
-        user_messages = len([msg for msg in self.conversation_history if msg["role"] == "user"])
-        assistant_messages = len([msg for msg in self.conversation_history if msg["role"] == "assistant"])
-        
-        return f"Conversation contains {message_count} messages: {user_messages} from user, {assistant_messages} from assistant."
+        return f"Conversation contains {message_count} messages: {self._user_count} from user, {self._assistant_count} from assistant."
     
     def export_conversation(self) -> str:
         """Export conversation history as JSON string."""
-        return json.dumps(self.conversation_history, indent=2)
+        return orjson.dumps(
+            list(self.conversation_history),
+            option=orjson.OPT_INDENT_2
+        ).decode()
     
     def import_conversation(self, conversation_json: str) -> None:
         """Import conversation history from JSON string."""
         try:
-            self.conversation_history = json.loads(conversation_json)
+            self.conversation_history = deque(
+                orjson.loads(conversation_json),
+                maxlen=Config.CONVERSATION_HISTORY_LIMIT
+            )
+            # Rebuild the wire-format buffer to match the imported history
+            self._api_messages = deque(
+                (
+                    {"role": msg["role"], "content": msg["content"]}
+                    for msg in self.conversation_history
+                    if msg["role"] in _WIRE_ROLES
+                ),
+                maxlen=Config.CONVERSATION_HISTORY_LIMIT
+            )
+            # Recompute the running counters in a single pass
+            self._user_count = 0
+            self._assistant_count = 0
+            self._total_chars = 0
+            for msg in self.conversation_history:
+                if msg["role"] == "user":
+                    self._user_count += 1
+                elif msg["role"] == "assistant":
+                    self._assistant_count += 1
+                self._total_chars += len(msg["content"])
+            self.conversation_version += 1
             logger.info("Conversation history imported successfully")
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.error(f"Failed to import conversation: {e}")
             raise ValueError("Invalid JSON format for conversation import")
\ No newline at end of file
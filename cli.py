@@ -4,8 +4,11 @@ Claude AI CLI - Command Line Interface for Claude 4 Sonnet
 """
 
 import argparse
+import io
 import sys
 import os
+import textwrap
+import threading
 from claude_ai import ClaudeAI
 from config import Config
 import readline
@@ -20,6 +23,11 @@ class ClaudeCLI:
         try:
             self.ai = ClaudeAI()
             self.running = True
+            # Reused wrappers keep their compiled regexes across calls
+            self._wrapper = textwrap.TextWrapper(width=80)
+            self._list_wrapper = textwrap.TextWrapper(
+                width=78, initial_indent='  • ', subsequent_indent='    '
+            )
             self.setup_readline()
             print("🤖 Claude AI CLI initialized successfully!")
             print(f"Model: {Config.CLAUDE_MODEL}")
@@ -34,18 +42,34 @@ class ClaudeCLI:
         try:
             # Enable history
             history_file = os.path.expanduser("~/.claude_ai_history")
-            try:
-                readline.read_history_file(history_file)
-            except FileNotFoundError:
-                pass
-            
-            # Save history on exit
+
+            def load_history():
+                try:
+                    readline.read_history_file(history_file)
+                except (FileNotFoundError, OSError):
+                    pass
+
+            # Load history in the background so the first prompt
+            # appears without waiting on disk I/O
+            threading.Thread(target=load_history, daemon=True).start()
+
+            # Save history on exit in a daemon thread so shutdown is
+            # not blocked on disk I/O
+            def save_history():
+                writer = threading.Thread(
+                    target=readline.write_history_file,
+                    args=(history_file,),
+                    daemon=True
+                )
+                writer.start()
+                writer.join(timeout=1.0)
+
             import atexit
-            atexit.register(readline.write_history_file, history_file)
-            
+            atexit.register(save_history)
+
             # Set history length
-            readline.set_history_length(1000)
-            
+            readline.set_history_length(200)
+
         except ImportError:
             # readline not available on all systems
             pass
@@ -100,41 +124,41 @@ Tips:
     
     def format_response(self, text, width=80):
         """Format response text for terminal display."""
-        import textwrap
-        
-        # Simple markdown-like formatting for terminal
-        lines = text.split('\n')
-        formatted_lines = []
-        
-        for line in lines:
+        wrapper = self._wrapper
+        list_wrapper = self._list_wrapper
+        if wrapper.width != width:
+            wrapper.width = width
+            list_wrapper.width = width - 2
+
+        # Simple markdown-like formatting for terminal; write into a
+        # single buffer instead of collecting and joining a list
+        buf = io.StringIO()
+        write = buf.write
+
+        for line in text.split('\n'):
             if line.startswith('# '):
                 # Header
-                formatted_lines.append(f"\n{'='*width}")
-                formatted_lines.append(f"  {line[2:].upper()}")
-                formatted_lines.append('='*width)
+                write(f"\n{'='*width}\n  {line[2:].upper()}\n{'='*width}\n")
             elif line.startswith('## '):
                 # Subheader
-                formatted_lines.append(f"\n{'-'*width}")
-                formatted_lines.append(f"  {line[3:]}")
-                formatted_lines.append('-'*width)
+                write(f"\n{'-'*width}\n  {line[3:]}\n{'-'*width}\n")
             elif line.startswith('```'):
                 # Code block marker
-                formatted_lines.append('┌' + '─'*(width-2) + '┐')
+                write('┌' + '─'*(width-2) + '┐\n')
                 if len(line) > 3:
-                    formatted_lines.append(f"│ {line[3:].ljust(width-4)} │")
+                    write(f"│ {line[3:].ljust(width-4)} │\n")
             elif line.strip().startswith('- '):
                 # List item
-                wrapped = textwrap.fill(line, width-2, initial_indent='  • ', subsequent_indent='    ')
-                formatted_lines.append(wrapped)
+                write(list_wrapper.fill(line))
+                write('\n')
             else:
                 # Regular text
                 if line.strip():
-                    wrapped = textwrap.fill(line, width)
-                    formatted_lines.append(wrapped)
-                else:
-                    formatted_lines.append('')
-        
-        return '\n'.join(formatted_lines)
+                    write(wrapper.fill(line))
+                write('\n')
+
+        # Drop the trailing newline so output matches the joined form
+        return buf.getvalue()[:-1]
     
     def clear_conversation(self):
         """Clear conversation history."""
@@ -199,9 +223,14 @@ Tips:
             print("No conversation data available.")
             return
         
-        user_messages = len([m for m in history if m['role'] == 'user'])
-        assistant_messages = len([m for m in history if m['role'] == 'assistant'])
-        total_chars = sum(len(m['content']) for m in history)
+        # Single pass over the history instead of one walk per statistic
+        user_messages = assistant_messages = total_chars = 0
+        for m in history:
+            if m['role'] == 'user':
+                user_messages += 1
+            elif m['role'] == 'assistant':
+                assistant_messages += 1
+            total_chars += len(m['content'])
         
         print(f"\n📊 Conversation Statistics:")
         print(f"   Total messages: {len(history)}")
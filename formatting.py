@@ -0,0 +1,72 @@
+import logging
+import threading
+import markdown
+import markupsafe
+import bleach
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Thread-local markdown converter and bleach cleaner, built once per thread.
+# Constructing a bleach Cleaner is expensive, so reuse it across requests.
+_tls = threading.local()
+
+# Characters that indicate the content may need full markdown rendering
+_MARKDOWN_CHARS = set('`*_#[>-')
+
+# Sanitizer whitelist, built once at import; frozenset membership checks
+# are O(1) where a per-call list literal would be scanned linearly
+_ALLOWED_TAGS = frozenset({
+    'p', 'br', 'strong', 'em', 'u', 'ol', 'ul', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'blockquote', 'code', 'pre', 'a', 'div', 'span'
+})
+_ALLOWED_ATTRS = {
+    'a': ['href', 'title'],
+    'div': ['class'],
+    'span': ['class'],
+    'code': ['class'],
+    'pre': ['class']
+}
+
+def _get_markdown():
+    """Get the thread-local Markdown converter, creating it on first use."""
+    md = getattr(_tls, 'md', None)
+    if md is None:
+        md = markdown.Markdown(extensions=['codehilite', 'fenced_code'])
+        _tls.md = md
+    return md
+
+def _get_cleaner():
+    """Get the thread-local bleach Cleaner, creating it on first use."""
+    cleaner = getattr(_tls, 'cleaner', None)
+    if cleaner is None:
+        cleaner = bleach.sanitizer.Cleaner(tags=_ALLOWED_TAGS, attributes=_ALLOWED_ATTRS)
+        _tls.cleaner = cleaner
+    return cleaner
+
+def escape_message(content: str) -> str:
+    """HTML-escape message content without markdown rendering."""
+    if not content or not content.strip():
+        return ''
+    return str(markupsafe.escape(content))
+
+def format_message(content: str) -> str:
+    """Format message content with markdown and sanitization."""
+    # Empty or whitespace-only content needs no rendering at all
+    if not content or not content.strip():
+        return ''
+    # Plain text without markdown syntax only needs HTML escaping
+    if not _MARKDOWN_CHARS.intersection(content) and '\n\n' not in content:
+        return str(markupsafe.escape(content))
+    try:
+        # Convert markdown to HTML
+        md = _get_markdown()
+        md.reset()
+        html = md.convert(content)
+        # Sanitize HTML to prevent XSS
+        safe_html = _get_cleaner().clean(html)
+        return safe_html
+    except Exception as e:
+        logger.error(f"Error formatting message: {e}")
+        return content
@@ -0,0 +1,14 @@
+"""Gunicorn configuration for the Claude AI application.
+
+Requests spend nearly all their time blocked on Anthropic API I/O, so
+gevent workers let each process keep hundreds of Claude calls in flight.
+
+Usage: gunicorn -c gunicorn.conf.py app:app
+"""
+
+import os
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '5000')}"
+worker_class = 'gevent'
+workers = int(os.getenv('GUNICORN_WORKERS', 4))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 500))
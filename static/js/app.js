@@ -98,7 +98,7 @@ class ClaudeAI {
         this.setLoading(true);
         
         try {
-            const response = await fetch('/api/chat', {
+            const response = await fetch('/api/chat?format=html', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
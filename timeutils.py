@@ -0,0 +1,14 @@
+import time
+from datetime import datetime
+
+# (epoch second, rendered string) cache; request metadata does not need
+# sub-second precision, so re-render at most once per second
+_cache = [0, '']
+
+def now_iso() -> str:
+    """Current local time in ISO format, cached at one-second granularity."""
+    s = int(time.time())
+    if s != _cache[0]:
+        _cache[0] = s
+        _cache[1] = datetime.fromtimestamp(s).isoformat()
+    return _cache[1]